@@ -1,113 +1,304 @@
 import os
 import re
+import time
 import base64
+import asyncio
+import atexit
 import logging
+import queue
 import sys
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
 from urllib.parse import quote
 from typing import Dict, Any
 
 import httpx
+import orjson
+from cachetools import TTLCache
 from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import HTMLResponse
-from pydantic import BaseModel
+from fastapi.responses import HTMLResponse, ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError, field_validator
+from starlette.background import BackgroundTask
+
+try:
+    # libuv-backed event loop; shipped with uvicorn[standard], absent on some hosts.
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
+
+# Handlers only enqueue records; a background thread does the blocking stdout writes.
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_stdout_handler = logging.StreamHandler(sys.stdout)
+_stdout_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+_log_listener = QueueListener(_log_queue, _stdout_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+# Unknown LOG_LEVEL values fall back to WARNING instead of failing at import.
+LOG_LEVEL = logging.getLevelNamesMapping().get(os.getenv("LOG_LEVEL", "WARNING").upper(), logging.WARNING)
 
 logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)],
+    level=LOG_LEVEL,
+    # QueueHandler pre-renders the message; the listener's handler applies the real format.
+    format="%(message)s",
+    handlers=[QueueHandler(_log_queue)],
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Spotify DL API", version="1.0.0")
+# Connections and locks are bound to the event loop that first uses them, and hosts
+# that skip the ASGI lifespan may run each request on a fresh loop, so they are
+# rebuilt whenever the running loop changes.
+_loop_state: Dict[str, Any] = {"loop": None, "client": None, "token_lock": None, "meta_locks": {}}
+
+def _current_loop_state() -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    if _loop_state["loop"] is not loop:
+        # The previous loop's client is dropped rather than closed: its loop may already be gone.
+        _loop_state.update(loop=loop, client=None, token_lock=asyncio.Lock(), meta_locks={})
+    return _loop_state
+
+def _get_client() -> httpx.AsyncClient:
+    state = _current_loop_state()
+    client = state["client"]
+    if client is None or client.is_closed:
+        # One pooled client per loop so upstream TCP/TLS sessions are reused across requests.
+        # HTTP/2 multiplexes token, tracks, search and spotmp3 calls over one connection per host.
+        # Pool settings live on the transport: httpx ignores client-level limits once one is passed.
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=64, max_connections=128, keepalive_expiry=60),
+        )
+        client = state["client"] = httpx.AsyncClient(timeout=httpx.Timeout(20.0, connect=5.0), transport=transport)
+    return client
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        yield
+    finally:
+        client = _loop_state["client"]
+        if client is not None and _loop_state["loop"] is asyncio.get_running_loop():
+            await client.aclose()
+        _loop_state["client"] = None
+
+app = FastAPI(
+    title="Spotify DL API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # Environment (configure in Vercel)
 SPOTIFY_CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID", "d2f27b893fb64c3a97242d8a1e46c63c")
 SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET", "8d31ddeef0614731be0e6cef6aebaad3")
 SPOTIFY_AUTH_URL = "https://accounts.spotify.com/api/token"
 SPOTIFY_API_BASE = "https://api.spotify.com/v1"
+SPOTMP3_CHECK_URL = "https://spotmp3.app/api/check-direct-download"
+SPOTMP3_DOWNLOAD_URL = "https://spotmp3.app/api/direct-download"
+
+# Credentials are fixed for the process lifetime, so build the token request once.
+_BASIC_AUTH = "Basic " + base64.b64encode(f"{SPOTIFY_CLIENT_ID}:{SPOTIFY_CLIENT_SECRET}".encode("utf-8")).decode("utf-8")
+_TOKEN_HEADERS = {
+    "Authorization": _BASIC_AUTH,
+    "Content-Type": "application/x-www-form-urlencoded",
+}
+_TOKEN_DATA = {"grant_type": "client_credentials"}
 
 API_OWNER = "Stellar"
 API_UPDATES = "@ApexServers"
 
+_EMPTY_Q_DETAIL = {
+    "status": "error",
+    "message": "Query required",
+    "example": "/sp/search?q=Song+Name",
+    "API_OWNER": API_OWNER,
+    "API_UPDATES": API_UPDATES,
+}
+
+# Transient upstream failures are retried before surfacing to the caller.
+# Timeouts are deliberately not retried: a hung upstream has already used its full timeout.
+# Once the budget is spent, 429/5xx surface as UpstreamUnavailable rather than being retried.
+UPSTREAM_RETRIES = 3
+RETRY_BACKOFF = 0.1
+RETRY_BUDGET = 2.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_ERRORS = (httpx.ConnectError, httpx.RemoteProtocolError)
+
+# Client-credentials tokens live ~3600s; reuse until shortly before expiry.
+TOKEN_EXPIRY_MARGIN = 60
+_token_cache: Dict[str, Any] = {"token": None, "expires_at": 0.0}
+
+# Track metadata is effectively immutable; search results drift, so keep them briefly.
+_meta_cache: TTLCache = TTLCache(maxsize=4096, ttl=3600)
+_search_cache: TTLCache = TTLCache(maxsize=1024, ttl=300)
+
+_SPOTIFY_TRACK_PREFIX = "https://open.spotify.com/track/"
+_SPOTIFY_URL_RE = re.compile("^" + re.escape(_SPOTIFY_TRACK_PREFIX) + r"([a-zA-Z0-9]{22})")
+
 class UrlRequest(BaseModel):
     url: str
 
-def validate_spotify_url(url: str) -> str:
-    if not url or not re.match(r"^https://open\.spotify\.com/track/[a-zA-Z0-9]+", url):
-        logger.error("Invalid Spotify track URL")
-        raise ValueError("Valid Spotify track URL required")
-    return url
+class SpotifyTrackUrl(BaseModel):
+    url: str
 
-def extract_track_id(url: str) -> str:
-    if re.match(r"^[a-zA-Z0-9]{22}$", url):
+    @field_validator("url")
+    @classmethod
+    def validate_spotify_url(cls, url: str) -> str:
+        if not _SPOTIFY_URL_RE.match(url):
+            raise ValueError("Valid Spotify track URL required")
         return url
-    match = re.search(r"spotify\.com/track/([a-zA-Z0-9]{22})", url)
-    if match:
-        return match.group(1)
-    logger.error("Failed to extract track ID")
-    raise ValueError("Invalid Spotify track ID or URL")
 
-async def get_spotify_token() -> str:
-    auth_string = f"{SPOTIFY_CLIENT_ID}:{SPOTIFY_CLIENT_SECRET}"
-    auth_b64 = base64.b64encode(auth_string.encode("utf-8")).decode("utf-8")
-    headers = {
-        "Authorization": f"Basic {auth_b64}",
-        "Content-Type": "application/x-www-form-urlencoded",
+    @property
+    def track_id(self) -> str:
+        # The validator guarantees a 22-char ID directly after the fixed prefix.
+        start = len(_SPOTIFY_TRACK_PREFIX)
+        return self.url[start:start + 22]
+
+class UpstreamUnavailable(Exception):
+    """Spotify or spotmp3 kept answering 429/5xx after the retry budget was spent."""
+
+    def __init__(self, status_code: int, retry_after: str = ""):
+        super().__init__(f"Upstream responded with {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+def upstream_unavailable_error(e: UpstreamUnavailable) -> HTTPException:
+    # Surface upstream throttling as such (429/503 + Retry-After) instead of a generic 500/400.
+    if e.status_code == 429:
+        status_code, message = 429, "Upstream rate limit reached, retry later"
+    else:
+        status_code, message = 503, "Upstream temporarily unavailable, retry later"
+    return HTTPException(
+        status_code=status_code,
+        detail={"status": "error", "message": message, "API_OWNER": API_OWNER, "API_UPDATES": API_UPDATES},
+        headers={"Retry-After": e.retry_after} if e.retry_after else None,
+    )
+
+async def upstream_request(method: str, url: str, **kwargs: Any) -> httpx.Response:
+    """Send via the shared client, retrying 429/5xx and dropped connections with backoff."""
+    slept = 0.0
+    for attempt in range(UPSTREAM_RETRIES):
+        delay = RETRY_BACKOFF * (2 ** attempt)
+        try:
+            r = await _get_client().request(method, url, **kwargs)
+        except RETRY_ERRORS as e:
+            if slept + delay > RETRY_BUDGET:
+                raise
+            logger.warning("Transport error from %s, retrying in %.1fs: %s", url, delay, e)
+        else:
+            if r.status_code not in RETRY_STATUSES:
+                return r
+            retry_after = r.headers.get("retry-after", "")
+            if retry_after.isdigit():
+                delay = float(retry_after)
+            if slept + delay > RETRY_BUDGET:
+                raise UpstreamUnavailable(r.status_code, retry_after)
+            logger.warning("Upstream %s returned %d, retrying in %.1fs", url, r.status_code, delay)
+        await asyncio.sleep(delay)
+        slept += delay
+    r = await _get_client().request(method, url, **kwargs)
+    if r.status_code in RETRY_STATUSES:
+        raise UpstreamUnavailable(r.status_code, r.headers.get("retry-after", ""))
+    return r
+
+def format_duration(duration_ms: int) -> str:
+    mins, secs = divmod(duration_ms // 1000, 60)
+    return f"{mins}:{secs:02d}"
+
+def build_track_metadata(track: Dict[str, Any]) -> Dict[str, Any]:
+    album = track["album"]
+    images = album["images"]
+    return {
+        "id": track["id"],
+        "title": track["name"],
+        "artists": [{"name": a["name"], "id": a["id"]} for a in track["artists"]],
+        "album": {
+            "name": album["name"],
+            "id": album["id"],
+            "release_date": album["release_date"],
+        },
+        "duration": format_duration(track["duration_ms"]),
+        "cover": images[0]["url"] if images else None,
+        "url": track["external_urls"]["spotify"],
+        "isrc": track.get("external_ids", {}).get("isrc", "N/A"),
     }
-    data = {"grant_type": "client_credentials"}
+
+async def get_spotify_token() -> str:
+    now = time.monotonic()
+    if _token_cache["token"] and now < _token_cache["expires_at"] - TOKEN_EXPIRY_MARGIN:
+        return _token_cache["token"]
+    async with _current_loop_state()["token_lock"]:
+        # Another request may have refreshed the token while we waited.
+        now = time.monotonic()
+        if _token_cache["token"] and now < _token_cache["expires_at"] - TOKEN_EXPIRY_MARGIN:
+            return _token_cache["token"]
+        return await _fetch_spotify_token(now)
+
+async def _fetch_spotify_token(now: float) -> str:
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
-            r = await client.post(SPOTIFY_AUTH_URL, headers=headers, data=data)
-            r.raise_for_status()
-            return r.json()["access_token"]
+        r = await upstream_request("POST", SPOTIFY_AUTH_URL, headers=_TOKEN_HEADERS, data=_TOKEN_DATA)
+        r.raise_for_status()
+        payload = orjson.loads(r.content)
+        _token_cache["token"] = payload["access_token"]
+        _token_cache["expires_at"] = now + payload.get("expires_in", 3600)
+        return _token_cache["token"]
     except httpx.HTTPError as e:
-        logger.error(f"Failed to get Spotify token: {e}")
+        logger.error("Failed to get Spotify token: %s", e)
         raise ValueError("Unable to authenticate with Spotify") from e
 
 async def get_track_metadata(track_id: str) -> Dict[str, Any]:
+    cached = _meta_cache.get(track_id)
+    if cached is not None:
+        return cached
+    # Per-ID lock so concurrent requests for the same track share one upstream fetch.
+    meta_locks = _current_loop_state()["meta_locks"]
+    lock = meta_locks.setdefault(track_id, asyncio.Lock())
+    try:
+        async with lock:
+            cached = _meta_cache.get(track_id)
+            if cached is not None:
+                return cached
+            track_data = await _fetch_track_metadata(track_id)
+            _meta_cache[track_id] = track_data
+            return track_data
+    finally:
+        if not lock.locked() and meta_locks.get(track_id) is lock:
+            del meta_locks[track_id]
+
+async def _fetch_track_metadata(track_id: str) -> Dict[str, Any]:
+    # The token is only needed on a cache miss, so it is resolved here rather than by callers.
     token = await get_spotify_token()
     headers = {"Authorization": f"Bearer {token}"}
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
-            r = await client.get(f"{SPOTIFY_API_BASE}/tracks/{track_id}", headers=headers)
-            r.raise_for_status()
-            track = r.json()
-            return {
-                "id": track["id"],
-                "title": track["name"],
-                "artists": [{"name": a["name"], "id": a["id"]} for a in track["artists"]],
-                "album": {
-                    "name": track["album"]["name"],
-                    "id": track["album"]["id"],
-                    "release_date": track["album"]["release_date"],
-                },
-                "duration": f"{track['duration_ms'] // 60000}:{(track['duration_ms'] % 60000) // 1000:02d}",
-                "cover": track["album"]["images"][0]["url"] if track["album"]["images"] else None,
-                "url": track["external_urls"]["spotify"],
-                "isrc": track.get("external_ids", {}).get("isrc", "N/A"),
-            }
+        r = await upstream_request("GET", f"{SPOTIFY_API_BASE}/tracks/{track_id}", headers=headers)
+        r.raise_for_status()
+        return build_track_metadata(orjson.loads(r.content))
     except httpx.HTTPError as e:
-        logger.error(f"Failed to fetch track metadata: {e}")
+        logger.error("Failed to fetch track metadata: %s", e)
         raise ValueError("Unable to retrieve track data") from e
 
-async def process_download(url: str) -> Dict[str, Any]:
+async def process_download(request: SpotifyTrackUrl) -> Dict[str, Any]:
     try:
-        validated_url = validate_spotify_url(url)
-        track_id = extract_track_id(validated_url)
-        logger.info(f"Processing track ID: {track_id}")
+        validated_url, track_id = request.url, request.track_id
+        logger.info("Processing track ID: %s", track_id)
 
-        track_data = await get_track_metadata(track_id)
-        logger.info(f"Retrieved metadata for track: {track_data['title']}")
+        quoted_url = quote(validated_url)
+        check_endpoint = f"{SPOTMP3_CHECK_URL}?url={quoted_url}"
+        logger.info("Checking download availability: %s", check_endpoint)
 
-        check_endpoint = f"https://spotmp3.app/api/check-direct-download?url={quote(validated_url)}"
-        logger.info(f"Checking download availability: {check_endpoint}")
+        # Metadata (token + /tracks) and the spotmp3 check are independent; overlap them.
+        track_data, check_response = await asyncio.gather(
+            get_track_metadata(track_id),
+            upstream_request("GET", check_endpoint, timeout=25),
+        )
+        logger.info("Retrieved metadata for track: %s", track_data["title"])
 
-        async with httpx.AsyncClient(timeout=25) as client:
-            check_response = await client.get(check_endpoint)
-            check_response.raise_for_status()
-            check_result = check_response.json()
+        check_response.raise_for_status()
+        check_result = orjson.loads(check_response.content)
 
-        logger.info(f"Download check result: {check_result}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Download check result: %s", check_result)
 
         response_data = {
             "status": "success",
@@ -118,115 +309,191 @@ async def process_download(url: str) -> Dict[str, Any]:
         }
 
         if check_result.get("cached"):
-            download_link = f"https://spotmp3.app/api/direct-download?url={quote(validated_url)}"
-            logger.info(f"Download link available: {download_link}")
+            download_link = f"{SPOTMP3_DOWNLOAD_URL}?url={quoted_url}"
+            logger.info("Download link available: %s", download_link)
             response_data["download"] = {"link": download_link}
         else:
             response_data["download"] = check_result
 
         return response_data
 
+    except UpstreamUnavailable as e:
+        logger.warning("Upstream unavailable during download: %s", e)
+        raise upstream_unavailable_error(e) from e
     except httpx.HTTPError as e:
-        logger.error(f"Network error during download check: {e}")
+        logger.error("Network error during download check: %s", e)
         raise HTTPException(
             status_code=500,
             detail={"status": "error", "message": str(e), "API_OWNER": API_OWNER, "API_UPDATES": API_UPDATES},
         ) from e
     except ValueError as e:
-        logger.error(f"Validation error: {e}")
+        logger.error("Validation error: %s", e)
         raise HTTPException(
             status_code=400,
             detail={"status": "error", "message": str(e), "API_OWNER": API_OWNER, "API_UPDATES": API_UPDATES},
         ) from e
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
+        logger.error("Unexpected error: %s", e)
         raise HTTPException(
             status_code=500,
             detail={"status": "error", "message": str(e), "API_OWNER": API_OWNER, "API_UPDATES": API_UPDATES},
         ) from e
 
+def parse_track_url(url: str) -> SpotifyTrackUrl:
+    try:
+        return SpotifyTrackUrl(url=url)
+    except ValidationError as e:
+        logger.error("Invalid Spotify track URL")
+        raise HTTPException(
+            status_code=400,
+            detail={"status": "error", "message": "Valid Spotify track URL required", "API_OWNER": API_OWNER, "API_UPDATES": API_UPDATES},
+        ) from e
+
 # === Routes ===
 
-@app.get("/", response_class=HTMLResponse)
-async def landing():
-    """Serve the violet docs/playground page."""
-    here = os.path.dirname(__file__)
-    path = os.path.join(here, "template", "index.html")
+def _load_landing_html() -> bytes:
+    path = os.path.join(os.path.dirname(__file__), "template", "index.html")
     try:
-        with open(path, "r", encoding="utf-8") as f:
+        with open(path, "rb") as f:
             html = f.read()
-        # inject current origin in curl examples at runtime via client-side script placeholder
-        html = html.replace("{{ORIGIN}}", "")
-        return HTMLResponse(content=html, status_code=200)
     except FileNotFoundError:
-        return HTMLResponse(
-            content="<h1>Docs page missing</h1><p>Place template at <code>api/template/index.html</code>.</p>",
-            status_code=200,
-        )
+        return b"<h1>Docs page missing</h1><p>Place template at <code>api/template/index.html</code>.</p>"
+    # inject current origin in curl examples at runtime via client-side script placeholder
+    return html.replace(b"{{ORIGIN}}", b"")
+
+# The template is static, so read it once per process instead of per request.
+_LANDING_HTML = _load_landing_html()
+
+@app.get("/", response_class=HTMLResponse)
+async def landing():
+    """Serve the violet docs/playground page."""
+    return HTMLResponse(content=_LANDING_HTML, status_code=200)
 
 @app.get("/sp/dl")
 async def download_get(url: str = Query(..., description="Spotify track URL")):
-    return await process_download(url)
+    return await process_download(parse_track_url(url))
 
 @app.post("/sp/dl")
 async def download_post(request: UrlRequest):
-    return await process_download(request.url)
+    return await process_download(parse_track_url(request.url))
+
+# Headers forwarded verbatim; the body is relayed as raw (still encoded) bytes.
+_STREAM_HEADERS = ("content-type", "content-length", "content-disposition", "content-encoding")
+# Anything else (JSON/HTML status pages) is an upstream error dressed up as a 2xx.
+_STREAM_MEDIA_TYPES = ("audio/", "application/octet-stream")
+
+@app.get("/sp/stream")
+async def stream(url: str = Query(..., description="Spotify track URL")):
+    request = parse_track_url(url)
+    quoted_url = quote(request.url)
+    upstream = None
+    try:
+        # Same gate as /sp/dl: spotmp3 only serves audio for tracks it has cached.
+        check_response = await upstream_request("GET", f"{SPOTMP3_CHECK_URL}?url={quoted_url}", timeout=25)
+        check_response.raise_for_status()
+        check_result = orjson.loads(check_response.content)
+        if check_result.get("cached"):
+            client = _get_client()
+            download_link = f"{SPOTMP3_DOWNLOAD_URL}?url={quoted_url}"
+            upstream = await client.send(client.build_request("GET", download_link, timeout=25), stream=True)
+    except UpstreamUnavailable as e:
+        logger.warning("Upstream unavailable during stream: %s", e)
+        raise upstream_unavailable_error(e) from e
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error("Network error during stream: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail={"status": "error", "message": str(e), "API_OWNER": API_OWNER, "API_UPDATES": API_UPDATES},
+        ) from e
+    except Exception as e:
+        logger.error("Unexpected stream error: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail={"status": "error", "message": str(e), "API_OWNER": API_OWNER, "API_UPDATES": API_UPDATES},
+        ) from e
+
+    if upstream is None:
+        logger.info("Stream requested for uncached track: %s", request.track_id)
+        raise HTTPException(
+            status_code=404,
+            detail={"status": "error", "message": "Download not available", "download": check_result, "API_OWNER": API_OWNER, "API_UPDATES": API_UPDATES},
+        )
+    content_type = upstream.headers.get("content-type", "")
+    if upstream.is_error or not content_type.startswith(_STREAM_MEDIA_TYPES):
+        await upstream.aclose()
+        logger.error("Stream upstream returned %d (%s)", upstream.status_code, content_type)
+        raise HTTPException(
+            status_code=502,
+            detail={"status": "error", "message": "Download not available", "API_OWNER": API_OWNER, "API_UPDATES": API_UPDATES},
+        )
+    return StreamingResponse(
+        upstream.aiter_raw(chunk_size=1 << 20),
+        media_type=content_type,
+        headers={k: upstream.headers[k] for k in _STREAM_HEADERS if k in upstream.headers},
+        background=BackgroundTask(upstream.aclose),
+    )
 
 @app.get("/sp/search")
 async def search(q: str = Query(..., description="Search query")):
     if not q:
         logger.error("Search query missing")
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "status": "error",
-                "message": "Query required",
-                "example": "/sp/search?q=Song+Name",
-                "API_OWNER": API_OWNER,
-                "API_UPDATES": API_UPDATES,
-            },
-        )
+        raise HTTPException(status_code=400, detail=_EMPTY_Q_DETAIL)
     try:
-        token = await get_spotify_token()
-        headers = {"Authorization": f"Bearer {token}"}
-        params = {"q": q, "type": "track", "limit": 5}
-        async with httpx.AsyncClient(timeout=20) as client:
-            r = await client.get(f"{SPOTIFY_API_BASE}/search", headers=headers, params=params)
+        cache_key = q.lower()
+        response_data = _search_cache.get(cache_key)
+        if response_data is None:
+            token = await get_spotify_token()
+            headers = {"Authorization": f"Bearer {token}"}
+            params = {"q": q, "type": "track", "limit": 5}
+            r = await upstream_request("GET", f"{SPOTIFY_API_BASE}/search", headers=headers, params=params)
             r.raise_for_status()
-            tracks = r.json()["tracks"]["items"]
-
-        if not tracks:
-            logger.info(f"No tracks found for query: {q}")
-            raise HTTPException(
-                status_code=404,
-                detail={"status": "error", "message": "No tracks found", "API_OWNER": API_OWNER, "API_UPDATES": API_UPDATES},
-            )
-
-        response_data = [
-            {
-                "title": t["name"],
-                "artist": ", ".join(a["name"] for a in t["artists"]),
-                "id": t["id"],
-                "url": t["external_urls"]["spotify"],
-                "album": t["album"]["name"],
-                "release_date": t["album"]["release_date"],
-                "duration": f"{t['duration_ms'] // 60000}:{(t['duration_ms'] % 60000) // 1000:02d}",
-                "cover": t["album"]["images"][0]["url"] if t["album"]["images"] else None,
-            }
-            for t in tracks
-        ]
-        logger.info(f"Found {len(response_data)} tracks for query: {q}")
+            tracks = orjson.loads(r.content)["tracks"]["items"]
+
+            if not tracks:
+                logger.info("No tracks found for query: %s", q)
+                raise HTTPException(
+                    status_code=404,
+                    detail={"status": "error", "message": "No tracks found", "API_OWNER": API_OWNER, "API_UPDATES": API_UPDATES},
+                )
+
+            # Search items are full track objects, so warm the metadata cache from them;
+            # a follow-up /sp/dl for any result then skips the /tracks round trip.
+            response_data = []
+            for t in tracks:
+                track_data = build_track_metadata(t)
+                _meta_cache[track_data["id"]] = track_data
+                album = track_data["album"]
+                response_data.append({
+                    "title": track_data["title"],
+                    "artist": ", ".join([a["name"] for a in track_data["artists"]]),
+                    "id": track_data["id"],
+                    "url": track_data["url"],
+                    "album": album["name"],
+                    "release_date": album["release_date"],
+                    "duration": track_data["duration"],
+                    "cover": track_data["cover"],
+                })
+            _search_cache[cache_key] = response_data
+        logger.info("Found %d tracks for query: %s", len(response_data), q)
         return {"status": "success", "results": response_data, "API_OWNER": API_OWNER, "API_UPDATES": API_UPDATES}
 
+    except UpstreamUnavailable as e:
+        logger.warning("Upstream unavailable during search: %s", e)
+        raise upstream_unavailable_error(e) from e
     except httpx.HTTPError as e:
-        logger.error(f"Search error: {e}")
+        logger.error("Search error: %s", e)
         raise HTTPException(
             status_code=500,
             detail={"status": "error", "message": str(e), "API_OWNER": API_OWNER, "API_UPDATES": API_UPDATES},
         ) from e
     except Exception as e:
-        logger.error(f"Unexpected search error: {e}")
+        logger.error("Unexpected search error: %s", e)
         raise HTTPException(
             status_code=500,
             detail={"status": "error", "message": str(e), "API_OWNER": API_OWNER, "API_UPDATES": API_UPDATES},
         ) from e
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "8000")), loop="uvloop", http="httptools")
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "api"))
+
+import index  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    index._token_cache.update(token=None, expires_at=0.0)
+    index._meta_cache.clear()
+    index._search_cache.clear()
+    yield
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record retry backoff instead of actually sleeping."""
+    recorded = []
+
+    async def fake_sleep(delay):
+        recorded.append(delay)
+
+    monkeypatch.setattr(index.asyncio, "sleep", fake_sleep)
+    return recorded
+
+
+@pytest.fixture
+def mock_upstream(monkeypatch):
+    """Install a handler that answers every upstream call made through _get_client()."""
+
+    def install(handler):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(index, "_get_client", lambda: client)
+        return client
+
+    return install
@@ -0,0 +1,39 @@
+import asyncio
+
+import index
+
+
+def run_on_new_loop(coro_fn):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro_fn())
+    finally:
+        loop.close()
+
+
+def test_client_and_locks_are_rebuilt_per_event_loop():
+    async def snapshot():
+        state = index._current_loop_state()
+        lock = state["token_lock"]
+
+        async def hold():
+            async with lock:
+                await asyncio.sleep(0)
+
+        # Contending on the lock binds it to this loop; a stale lock would raise here.
+        await asyncio.gather(hold(), hold())
+        return index._get_client(), lock, state["meta_locks"]
+
+    first = run_on_new_loop(snapshot)
+    second = run_on_new_loop(snapshot)
+    assert first[0] is not second[0]
+    assert first[1] is not second[1]
+    assert first[2] is not second[2]
+
+
+def test_client_is_reused_within_a_loop():
+    async def clients():
+        return index._get_client(), index._get_client()
+
+    a, b = run_on_new_loop(clients)
+    assert a is b
@@ -0,0 +1,89 @@
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import index
+
+TRACK_URL = "https://open.spotify.com/track/4uLU6hMCjMI75M1A2tKUQC"
+
+
+class ChunkedBody(httpx.AsyncByteStream):
+    async def __aiter__(self):
+        for _ in range(3):
+            yield b"\xff\xfb" * 512
+
+
+def spotmp3(cached=True, download=None):
+    """Handler for the spotmp3 check + direct-download pair."""
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.path == "/api/check-direct-download":
+            return httpx.Response(200, json={"cached": cached})
+        return download()
+
+    return handler, calls
+
+
+def audio(content_type="audio/mpeg", status=200):
+    return lambda: httpx.Response(
+        status,
+        stream=ChunkedBody(),
+        headers={"content-type": content_type, "content-disposition": 'attachment; filename="track.mp3"'},
+    )
+
+
+@pytest.mark.parametrize("content_type", ["audio/mpeg", "application/octet-stream"])
+def test_relays_cached_download(mock_upstream, content_type):
+    handler, calls = spotmp3(download=audio(content_type))
+    mock_upstream(handler)
+    r = TestClient(index.app).get("/sp/stream", params={"url": TRACK_URL})
+    assert r.status_code == 200
+    assert r.headers["content-type"] == content_type
+    assert r.headers["content-disposition"] == 'attachment; filename="track.mp3"'
+    assert len(r.content) == 3 * 1024
+    assert calls == ["/api/check-direct-download", "/api/direct-download"]
+
+
+def test_uncached_track_is_404_without_download(mock_upstream):
+    handler, calls = spotmp3(cached=False, download=audio())
+    mock_upstream(handler)
+    r = TestClient(index.app).get("/sp/stream", params={"url": TRACK_URL})
+    assert r.status_code == 404
+    assert r.json()["detail"]["download"] == {"cached": False}
+    assert calls == ["/api/check-direct-download"]
+
+
+@pytest.mark.parametrize(
+    "download",
+    [
+        lambda: httpx.Response(200, json={"status": "processing"}),
+        lambda: httpx.Response(200, html="<h1>Not ready</h1>"),
+        audio(status=500),
+    ],
+)
+def test_non_audio_or_error_upstream_is_502(mock_upstream, download):
+    handler, _ = spotmp3(download=download)
+    mock_upstream(handler)
+    r = TestClient(index.app).get("/sp/stream", params={"url": TRACK_URL})
+    assert r.status_code == 502
+    assert r.json()["detail"]["message"] == "Download not available"
+
+
+def test_invalid_url_is_400(mock_upstream):
+    handler, calls = spotmp3(download=audio())
+    mock_upstream(handler)
+    r = TestClient(index.app).get("/sp/stream", params={"url": "https://example.com/track"})
+    assert r.status_code == 400
+    assert calls == []
+
+
+def test_unexpected_error_keeps_api_error_body(mock_upstream):
+    def handler(request):
+        raise RuntimeError("the handler is closed")
+
+    mock_upstream(handler)
+    r = TestClient(index.app).get("/sp/stream", params={"url": TRACK_URL})
+    assert r.status_code == 500
+    assert r.json()["detail"]["status"] == "error"
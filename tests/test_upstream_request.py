@@ -0,0 +1,122 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import index
+
+URL = "https://api.spotify.com/v1/search"
+
+
+def responses(*items):
+    """Handler returning each item in turn; exceptions are raised, ints become bare statuses."""
+    calls = []
+
+    def handler(request):
+        item = items[min(len(calls), len(items) - 1)]
+        calls.append(request)
+        if isinstance(item, Exception):
+            raise item
+        if isinstance(item, int):
+            return httpx.Response(item)
+        return item
+
+    return handler, calls
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_returns_first_success_without_retry(mock_upstream, sleeps):
+    handler, calls = responses(200)
+    mock_upstream(handler)
+    assert run(index.upstream_request("GET", URL)).status_code == 200
+    assert len(calls) == 1
+    assert sleeps == []
+
+
+def test_retries_5xx_with_exponential_backoff(mock_upstream, sleeps):
+    handler, calls = responses(502, 503, 500, 200)
+    mock_upstream(handler)
+    assert run(index.upstream_request("GET", URL)).status_code == 200
+    assert len(calls) == 4
+    assert sleeps == [0.1, 0.2, 0.4]
+
+
+def test_honours_retry_after_within_budget(mock_upstream, sleeps):
+    handler, calls = responses(httpx.Response(429, headers={"retry-after": "1"}), 200)
+    mock_upstream(handler)
+    assert run(index.upstream_request("GET", URL)).status_code == 200
+    assert sleeps == [1.0]
+
+
+def test_retry_after_beyond_budget_raises_without_sleeping(mock_upstream, sleeps):
+    handler, calls = responses(httpx.Response(429, headers={"retry-after": "30"}))
+    mock_upstream(handler)
+    with pytest.raises(index.UpstreamUnavailable) as exc:
+        run(index.upstream_request("GET", URL))
+    assert exc.value.status_code == 429
+    assert exc.value.retry_after == "30"
+    assert len(calls) == 1
+    assert sleeps == []
+
+
+def test_non_numeric_retry_after_falls_back_to_backoff(mock_upstream, sleeps):
+    handler, calls = responses(httpx.Response(429, headers={"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}), 200)
+    mock_upstream(handler)
+    assert run(index.upstream_request("GET", URL)).status_code == 200
+    assert sleeps == [0.1]
+
+
+def test_persistent_5xx_raises_after_last_attempt(mock_upstream, sleeps):
+    handler, calls = responses(503)
+    mock_upstream(handler)
+    with pytest.raises(index.UpstreamUnavailable) as exc:
+        run(index.upstream_request("GET", URL))
+    assert exc.value.status_code == 503
+    assert len(calls) == index.UPSTREAM_RETRIES + 1
+
+
+def test_connect_errors_are_retried(mock_upstream, sleeps):
+    handler, calls = responses(httpx.ConnectError("refused"), 200)
+    mock_upstream(handler)
+    assert run(index.upstream_request("GET", URL)).status_code == 200
+    assert len(calls) == 2
+
+
+def test_timeouts_are_not_retried(mock_upstream, sleeps):
+    handler, calls = responses(httpx.ReadTimeout("slow"))
+    mock_upstream(handler)
+    with pytest.raises(httpx.ReadTimeout):
+        run(index.upstream_request("GET", URL))
+    assert len(calls) == 1
+    assert sleeps == []
+
+
+def test_rate_limited_search_returns_429_with_retry_after(mock_upstream, sleeps):
+    def handler(request):
+        if request.url.host == "accounts.spotify.com":
+            return httpx.Response(200, json={"access_token": "tok", "expires_in": 3600})
+        return httpx.Response(429, headers={"retry-after": "7"})
+
+    mock_upstream(handler)
+    r = TestClient(index.app).get("/sp/search", params={"q": "Believer"})
+    assert r.status_code == 429
+    assert r.headers["retry-after"] == "7"
+    assert r.json()["detail"]["status"] == "error"
+
+
+def test_unavailable_track_lookup_returns_503(mock_upstream, sleeps):
+    def handler(request):
+        if request.url.host == "accounts.spotify.com":
+            return httpx.Response(200, json={"access_token": "tok", "expires_in": 3600})
+        if request.url.host == "spotmp3.app":
+            return httpx.Response(200, json={"cached": False})
+        return httpx.Response(503)
+
+    mock_upstream(handler)
+    r = TestClient(index.app).get("/sp/dl", params={"url": "https://open.spotify.com/track/4uLU6hMCjMI75M1A2tKUQC"})
+    assert r.status_code == 503
+    assert "retry-after" not in r.headers